@@ -1,3 +1,4 @@
+DROP TABLE IF EXISTS items_fts;
 DROP TABLE IF EXISTS items;
 
 CREATE TABLE items (
@@ -12,11 +13,32 @@ CREATE TABLE items (
     coordinates TEXT NOT NULL
 );
 
+-- полнотекстовый индекс по названиям для поиска подстроки (триграммы, SQLite 3.34+)
+CREATE VIRTUAL TABLE items_fts USING fts5(name, content='items', content_rowid='id', tokenize='trigram');
+
+CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
+CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+
+-- только при смене названия, чтобы изменение amount при бронировании не трогало индекс
+CREATE TRIGGER items_fts_update AFTER UPDATE OF name ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
 DROP TABLE IF EXISTS bookings;
 
 CREATE TABLE bookings (
     booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
     item_id INTEGER NOT NULL,
     amount INTEGER NOT NULL,
-    confirmed INTEGER NOT NULL
+    confirmed INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
+
+-- неподтвержденные бронирования, используется автоматической отменой просроченных
+CREATE INDEX ix_bookings_pending_created ON bookings(created_at) WHERE confirmed = 0;
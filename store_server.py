@@ -1,14 +1,52 @@
 import asyncio
+import contextlib
+import logging
+import logging.handlers
+import queue
 import sqlite3
-from flask import Flask, request, abort, jsonify
-from threading import Thread
+import sys
+import aiosqlite
+import orjson
+from quart import Quart, Response, request, abort
+from quart.json.provider import JSONProvider
 import datetime
 import re
+import time
 from argparse import ArgumentParser
+from hypercorn.config import Config
+from hypercorn.run import run
 
-app = Flask(__name__)
 
-# Сервер на Flask с использованием дополнительного треда для отложенных операций отмены бронирования (asyncio, Thread)
+# JSON запросов и ответов через orjson вместо стандартного json
+class OrjsonProvider(JSONProvider):
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson сразу дает bytes, без промежуточной строки
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps(obj), mimetype='application/json')
+
+    def _dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+
+
+class StoreApp(Quart):
+    json_provider_class = OrjsonProvider
+
+
+app = StoreApp(__name__)
+logger = logging.getLogger(__name__)
+# тело больше лимита отклоняется с 413 еще до чтения; пакет из BATCH_LIMIT операций в него помещается
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+
+# Сервер на Quart (асинхронный аналог Flask); отложенная отмена бронирований работает
+# фоновой задачей в том же event loop, что и сервер
 
 # Имеется 2 таблицы в формате SQLite: items (хранит предметы на складе), bookings (хранит бронирования)
 # Схема таблиц описана в schema.sql
@@ -25,7 +63,11 @@ app = Flask(__name__)
 # В течение суток клиент должен подтвердить бронирование /confirm_booking (если он нашел доставщика),
 # либо отменить его /cancel_booking.
 # Если клиент не подтвердит бронирование в течение суток,
-# то происходит автоматическая отмена бронирования (для этого используется отдельный поток).
+# то происходит автоматическая отмена бронирования
+# (фоновая задача раз в минуту отменяет все просроченные бронирования одним запросом).
+
+# Для нескольких бронирований сразу есть /booking_batch, /confirm_batch и /cancel_batch:
+# принимают JSON-массив и выполняют все операции в одной транзакции.
 
 # При отмене бронирования забронированное количество снова становится доступно для бронирования, бронирование удаляется.
 # При подтверждении бронирования ставится соответствующий флаг в таблице bookings,
@@ -34,155 +76,456 @@ app = Flask(__name__)
 # Операции к БД выполняются атомарно, если это возможно.
 
 
-# получить доступ
-def get_db_connection():
-    conn = sqlite3.connect('store.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+DB_PATH = 'store.db'
+# RETURNING требует SQLite 3.35+, триграммный токенизатор FTS5 - 3.34+
+SQLITE_MIN_VERSION = (3, 35, 0)
+READ_POOL_SIZE = 8
+
+# настройки каждого соединения, выполняются один раз при его открытии
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA cache_size=-1048576',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Тексты запросов вынесены в константы: одинаковый текст попадает в кэш подготовленных
+# выражений соединения (cached_statements) и не компилируется заново на каждый запрос
+STATEMENT_CACHE_SIZE = 256
+
+# поля предмета в ответе поиска; id отдается строкой, приводится сразу в SQL
+ITEM_COLUMNS = ('id', 'weight', 'volume', 'amount', 'price', 'image_url', 'name', 'street_address', 'coordinates')
+ITEM_SELECT = 'SELECT CAST(items.id AS TEXT), ' + ', '.join('items.' + c for c in ITEM_COLUMNS[1:]) + ' FROM items'
+SQL_ALL_ITEMS = ITEM_SELECT
+# LIKE по триграммному индексу items_fts использует индекс, если в подстроке от 3 символов
+SQL_SEARCH_ITEMS = ITEM_SELECT + " JOIN items_fts ON items.id = items_fts.rowid WHERE items_fts.name LIKE '%' || ? || '%'"
+SQL_RESERVE_ITEM = 'UPDATE items SET amount = amount - ? WHERE id = ? AND amount >= ? RETURNING coordinates'
+SQL_INSERT_BOOKING = 'INSERT INTO bookings (item_id, amount, confirmed) VALUES (?, ?, 0) RETURNING booking_id'
+# RETURNING показывает, затронул ли запрос строку: total_changes общий на соединение и для этого не подходит
+SQL_CONFIRM = 'UPDATE bookings SET confirmed = 1 WHERE booking_id = ? AND confirmed = 0 RETURNING booking_id'
+# для пакета через executemany: rowcount курсора считает изменения только этого вызова
+SQL_CONFIRM_MANY = 'UPDATE bookings SET confirmed = 1 WHERE booking_id = ? AND confirmed = 0'
+# весь пакет номеров передается одним JSON-массивом; повторный номер удаляется только один раз
+SQL_CANCEL_DELETE = '''
+DELETE FROM bookings
+ WHERE booking_id IN (SELECT value FROM json_each(?)) AND confirmed = 0
+ RETURNING booking_id, item_id, amount
+ '''
+# автоматическая отмена всех неподтвержденных бронирований старше BOOKING_LIFETIME
+SQL_EXPIRE_DELETE = "DELETE FROM bookings WHERE confirmed = 0 AND created_at < datetime('now', ?) RETURNING item_id, amount"
+# increase amount back to what it was before (for every deleted booking)
+SQL_RESTOCK = 'UPDATE items SET amount = amount + ? WHERE id = ?'
+
+# неподтвержденное бронирование живет сутки, просроченные отменяются раз в минуту
+BOOKING_LIFETIME = '-1 day'
+SWEEP_INTERVAL = 60
+
+# оставляем только буквы и цифры для защиты от SQL инъекций
+SANITIZE_RE = re.compile('[^a-zA-Z А-Яа-я0-9]+')
+
+# ответы поиска кэшируются на LISTING_TTL секунд: запрос -> (время, версия items, тело ответа).
+# Бронирование и отмена меняют amount и увеличивают items_version, после чего старые ответы не используются
+LISTING_TTL = 2.0
+# ограничение по числу записей и по суммарному размеру тел ответов в байтах
+LISTING_CACHE_SIZE = 256
+LISTING_CACHE_BYTES = 16 * 1024 * 1024
+listing_cache = {}
+listing_cache_bytes = 0
+items_version = 0
+
+# максимальное число операций в одном пакетном запросе
+BATCH_LIMIT = 1000
+# целые в SQLite 64-битные: большее число упало бы с OverflowError уже внутри транзакции
+SQLITE_INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+# Соединения открываются один раз при запуске (init_pool) и переиспользуются между запросами:
+# одно соединение для записи под write_lock и пул соединений только для чтения.
+# Запросы выполняются через aiosqlite: пока SQLite работает, event loop обслуживает другие запросы
+read_pool = None
+write_con = None
+write_lock = None
+
+
+# проверить версию SQLite, с которой собран модуль sqlite3 (его же использует aiosqlite)
+def check_sqlite_version():
+    if sqlite3.sqlite_version_info < SQLITE_MIN_VERSION:
+        raise RuntimeError('SQLite %s+ is required (RETURNING, FTS5 trigram), found %s'
+                           % ('.'.join(map(str, SQLITE_MIN_VERSION)), sqlite3.sqlite_version))
+
+
+# открыть соединение с БД
+async def open_connection(readonly=False):
+    if readonly:
+        conn = await aiosqlite.connect('file:%s?mode=ro' % DB_PATH, uri=True,
+                                       cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        # транзакции писателя открываются явно через BEGIN IMMEDIATE
+        conn = await aiosqlite.connect(DB_PATH, isolation_level=None,
+                                       cached_statements=STATEMENT_CACHE_SIZE)
+        # WAL сохраняется в файле БД: читатели не блокируют писателя
+        await conn.execute('PRAGMA journal_mode=WAL')
+    for pragma in CONNECTION_PRAGMAS:
+        await conn.execute(pragma)
+    conn.row_factory = aiosqlite.Row
     return conn
 
 
-# операция отмены бронирования в БД
-def cancel_booking(booking_id):
-    con = get_db_connection()
-    # increase amount back to what it was before (if booking still exists)
-    con.execute('''
-    UPDATE items
-     SET amount = amount +
-     (SELECT amount FROM bookings b WHERE b.booking_id = ? AND items.id = b.item_id AND b.confirmed = 0)
-     WHERE id IN (SELECT item_id FROM bookings b WHERE b.booking_id = ? AND b.confirmed = 0)
-     ''', (booking_id, booking_id))
-    # delete booking
-    con.execute('DELETE FROM bookings WHERE booking_id = ? AND confirmed = 0', (booking_id, ))
-    con.commit()
-    w = con.total_changes
-    con.close()
-    if w > 0:
-        print('canceled booking', booking_id)
+# открыть соединения пула (очередь и блокировка создаются внутри event loop сервера)
+async def init_pool():
+    global read_pool, write_con, write_lock
+    write_con = await open_connection()
+    write_lock = asyncio.Lock()
+    read_pool = asyncio.Queue()
+    for _ in range(READ_POOL_SIZE):
+        read_pool.put_nowait(await open_connection(readonly=True))
+
+
+# закрыть соединения пула; писатель закрывается под write_lock, после завершения текущей транзакции
+async def close_pool():
+    async with write_lock:
+        await write_con.close()
+    while not read_pool.empty():
+        await read_pool.get_nowait().close()
+
+
+# взять соединение для чтения из пула
+@contextlib.asynccontextmanager
+async def borrow_conn():
+    con = await read_pool.get()
+    try:
+        yield con
+    finally:
+        read_pool.put_nowait(con)
+
+
+# взять соединение для записи (одновременно только один писатель)
+@contextlib.asynccontextmanager
+async def borrow_write_conn():
+    async with write_lock:
+        try:
+            yield write_con
+        except BaseException:
+            # не оставляем незавершенную транзакцию следующему запросу
+            await write_con.rollback()
+            raise
+
+
+# операция отмены бронирований в БД, все номера отменяются в одной транзакции.
+# Возвращает число отмененных бронирований
+async def cancel_bookings(booking_ids):
+    async with borrow_write_conn() as con:
+        await con.execute('BEGIN IMMEDIATE')
+        # delete bookings, RETURNING gives the amounts to put back
+        deleted = await con.execute_fetchall(SQL_CANCEL_DELETE, (orjson.dumps(booking_ids).decode(), ))
+        await con.executemany(SQL_RESTOCK, [(res['amount'], res['item_id']) for res in deleted])
+        await con.commit()
+    canceled = [res['booking_id'] for res in deleted]
+    if canceled:
+        invalidate_items()
+        logger.info('canceled bookings %s', canceled)
+    return len(canceled)
+
+
+# операция создания бронирований в БД: все или ни одного, в одной транзакции.
+# Возвращает номера бронирований и координаты складов
+async def create_bookings(orders):
+    created = []
+    async with borrow_write_conn() as con:
+        await con.execute('BEGIN IMMEDIATE')
+        for item_id, quantity in orders:
+            # проверка остатка и списание одним запросом (RETURNING требует SQLite 3.35+)
+            res = await (await con.execute(SQL_RESERVE_ITEM, (quantity, item_id, quantity))).fetchone()
+            if res is None:
+                abort(400, "no such item or not enough amount")
+            booking_id = (await (await con.execute(SQL_INSERT_BOOKING, (item_id, quantity))).fetchone())['booking_id']
+            created.append((booking_id, res['coordinates']))
+        await con.commit()
+    invalidate_items()
+    return created
+
+
+# операция подтверждения бронирований в БД, возвращает число подтвержденных
+async def confirm_bookings(booking_ids):
+    async with borrow_write_conn() as con:
+        await con.execute('BEGIN IMMEDIATE')
+        w = (await con.executemany(SQL_CONFIRM_MANY, [(b, ) for b in booking_ids])).rowcount
+        await con.commit()
     return w
 
 
-# отложенная операция отмены бронирования
-async def check_booking(booking_id):
-    # change to 60 * 60 * 24 for 1 day delay
-    await asyncio.sleep(600)
-    w = cancel_booking(booking_id)
+# ответ на создание бронирования
+def booking_info(booking_id, coordinates):
+    date = (datetime.datetime.now() + datetime.timedelta(days=2)).strftime('%Y-%m-%d')
+    return {'id': str(booking_id), 'address': coordinates, 'available_date': date}
+
+
+# прочитать целое поле JSON-объекта запроса: (успех, значение)
+def parse_int(q, key):
+    try:
+        value = int(q.get(key))
+    except (TypeError, ValueError, AttributeError):
+        return False, None
+    if value not in SQLITE_INT_RANGE:
+        return False, None
+    return True, value
+
+
+# прочитать заказ {"item_id": ..., "quantity": ...}; отрицательное количество пополнило бы склад
+def parse_order(q):
+    ok_item, item_id = parse_int(q, 'item_id')
+    ok_quantity, quantity = parse_int(q, 'quantity')
+    if not (ok_item and ok_quantity):
+        abort(400, "item_id or quantity not provided")
+    if quantity <= 0:
+        abort(400, "quantity must be positive")
+    return item_id, quantity
+
+
+# прочитать номер бронирования {"booking_id": ...}
+def parse_booking_id(q):
+    ok, booking_id = parse_int(q, 'booking_id')
+    if not ok:
+        abort(400, "booking_id not provided")
+    return booking_id
+
+
+# прочитать JSON-массив номеров бронирований для пакетного запроса
+def parse_booking_ids(q):
+    if not isinstance(q, list) or not 0 < len(q) <= BATCH_LIMIT:
+        abort(400, "expected a list of 1..%d booking ids" % BATCH_LIMIT)
+    try:
+        booking_ids = [int(b) for b in q]
+    except (TypeError, ValueError):
+        abort(400, "booking ids must be integers")
+    if not all(b in SQLITE_INT_RANGE for b in booking_ids):
+        abort(400, "booking ids must be integers")
+    return booking_ids
+
+
+# операция отмены всех просроченных бронирований в БД
+async def cancel_expired_bookings():
+    async with borrow_write_conn() as con:
+        await con.execute('BEGIN IMMEDIATE')
+        # количество возвращается ровно по тем бронированиям, которые удалил DELETE
+        expired = await con.execute_fetchall(SQL_EXPIRE_DELETE, (BOOKING_LIFETIME, ))
+        await con.executemany(SQL_RESTOCK, [(res['amount'], res['item_id']) for res in expired])
+        await con.commit()
+    w = len(expired)
+    if w > 0:
+        invalidate_items()
+        logger.info('canceled expired bookings %d', w)
     return w
 
 
+# периодическая отмена просроченных бронирований (одна задача на все бронирования)
+async def sweep_bookings():
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        # ошибка одного прохода (например, database is locked) не должна останавливать отмену навсегда
+        try:
+            await cancel_expired_bookings()
+        except Exception:
+            logger.exception('failed to cancel expired bookings')
+
+
+# выполнить запрос к items и сериализовать результат в JSON
+async def fetch_items(sql, params):
+    async with borrow_conn() as con:
+        res = await con.execute_fetchall(sql, params)
+    # колонки известны заранее: строка собирается через dict(zip(...)) без обработки отдельных полей
+    return orjson.dumps([dict(zip(ITEM_COLUMNS, w)) for w in res])
+
+
+# сбросить кэш ответов поиска после изменения items
+def invalidate_items():
+    global items_version
+    items_version += 1
+
+
+# ответ поиска из кэша, если он свежий, иначе из БД
+async def cached_items(substring):
+    now = time.monotonic()
+    entry = listing_cache.get(substring)
+    if entry is not None and entry[1] == items_version and now - entry[0] < LISTING_TTL:
+        return entry[2]
+    # версия запоминается до запроса: если items изменятся во время него, ответ сразу устареет
+    version = items_version
+    if substring:
+        body = await fetch_items(SQL_SEARCH_ITEMS, (substring, ))
+    else:
+        # пустой запрос не требует поиска: отдаем весь список
+        body = await fetch_items(SQL_ALL_ITEMS, ())
+    store_listing(substring, now, version, body)
+    return body
+
+
+# удалить ответ из кэша
+def drop_listing(substring):
+    global listing_cache_bytes
+    listing_cache_bytes -= len(listing_cache.pop(substring)[2])
+
+
+# положить ответ в кэш: сначала выбрасываются устаревшие записи, затем самые старые, пока не хватит места
+def store_listing(substring, now, version, body):
+    global listing_cache_bytes
+    # items изменились во время запроса или ответ не помещается в кэш целиком
+    if version != items_version or len(body) > LISTING_CACHE_BYTES:
+        return
+    for key, (created, entry_version, _) in list(listing_cache.items()):
+        if key == substring or entry_version != items_version or now - created >= LISTING_TTL:
+            drop_listing(key)
+    # записи добавляются по времени, поэтому первая в словаре самая старая
+    while listing_cache and (len(listing_cache) >= LISTING_CACHE_SIZE
+                             or listing_cache_bytes + len(body) > LISTING_CACHE_BYTES):
+        drop_listing(next(iter(listing_cache)))
+    listing_cache[substring] = (now, version, body)
+    listing_cache_bytes += len(body)
+
+
 # получить предметы с подходящим названием
 @app.route('/items_by_string', methods=['GET'])
-def get_everything():
-    substring = None
-    try:
-        substring = str(request.args.get('query', ''))
-    except:
-        pass
-    if substring is None:
-        substring = ''
-    # оставляем только буквы и цифры для защиты от SQL инъекций
-    substring = re.sub('[^a-zA-Z А-Яа-я0-9]+', '', substring)
-    con = get_db_connection()
-    res = con.execute("SELECT * FROM items WHERE name LIKE '%' || ? || '%'", (substring, )).fetchall()
-    if res is None:
-        return jsonify([])
-    con.close()
-    return jsonify([{x: str(w[x]) if x == 'id' else w[x] for x in w.keys()} for w in res])
+async def get_everything():
+    substring = request.args.get('query', '')
+    substring = SANITIZE_RE.sub('', substring)
+    body = await cached_items(substring)
+    return Response(body, mimetype='application/json')
 
 
 # создать бронирование
 @app.route('/booking', methods=['POST'])
-def make_booking():
-    item_id = 0
-    quantity = 0
-    q = request.json
-    try:
-        item_id = int(q.get('item_id'))
-        quantity = int(q.get('quantity'))
-    except:
-        abort(400, "item_id or quantity not provided")
-    con = get_db_connection()
-    cursor = con.cursor()
-    res = cursor.execute('SELECT * FROM items WHERE id = ?', (item_id, )).fetchone()
-    if res is None:
-        abort(400, "no such item")
-    if res['amount'] < quantity:
-        abort(400, "not enough amount")
-    cursor.execute('UPDATE items SET amount = amount - ? WHERE id = ?', (quantity, item_id))
-    cursor.execute('INSERT INTO bookings (item_id, amount, confirmed) VALUES (?, ?, 0)', (item_id, quantity))
-    con.commit()
-    booking_id = cursor.lastrowid
-    asyncio.run_coroutine_threadsafe(check_booking(booking_id), loop)
-    date = (datetime.datetime.now() + datetime.timedelta(days=2)).strftime('%Y-%m-%d')
-    con.close()
-    return {'id': str(booking_id), 'address': res['coordinates'], 'available_date': date}
+async def make_booking():
+    item_id, quantity = parse_order(await request.get_json())
+    [(booking_id, coordinates)] = await create_bookings([(item_id, quantity)])
+    return booking_info(booking_id, coordinates)
+
+
+# создать несколько бронирований: [{"item_id": ..., "quantity": ...}, ...]
+@app.route('/booking_batch', methods=['POST'])
+async def make_booking_batch():
+    q = await request.get_json()
+    if not isinstance(q, list) or not 0 < len(q) <= BATCH_LIMIT:
+        abort(400, "expected a list of 1..%d bookings" % BATCH_LIMIT)
+    orders = [parse_order(o) for o in q]
+    created = await create_bookings(orders)
+    return {'bookings': [booking_info(booking_id, coordinates) for booking_id, coordinates in created]}
 
 
 # отменить бронирование
 @app.route('/cancel_booking', methods=['POST'])
-def cancel():
-    booking_id = -1
-    q = request.json
-    try:
-        booking_id = int(q.get('booking_id'))
-    except:
-        abort(400, "booking_id not provided")
-    w = cancel_booking(booking_id)
+async def cancel():
+    booking_id = parse_booking_id(await request.get_json())
+    w = await cancel_bookings([booking_id])
     if w > 0:
         return {}
     else:
         abort(400, "This booking cannot be canceled")
 
 
+# отменить несколько бронирований: [booking_id, ...], возвращает число отмененных
+@app.route('/cancel_batch', methods=['POST'])
+async def cancel_batch():
+    booking_ids = parse_booking_ids(await request.get_json())
+    w = await cancel_bookings(booking_ids)
+    return {'canceled': w}
+
+
 # подтвердить бронирование
 @app.route('/confirm_booking', methods=['POST'])
-def confirm_booking():
-    booking_id = -1
-    q = request.json
-    try:
-        booking_id = int(q.get('booking_id'))
-    except:
-        abort(400, "booking_id not provided")
-    con = get_db_connection()
-    con.execute('UPDATE bookings SET confirmed = 1 WHERE booking_id = ? AND confirmed = 0', (booking_id,))
-    con.commit()
-    w = con.total_changes
-    con.close()
-    if w > 0:
+async def confirm_booking():
+    booking_id = parse_booking_id(await request.get_json())
+    async with borrow_write_conn() as con:
+        # одиночный запрос выполняется в режиме autocommit
+        res = await (await con.execute(SQL_CONFIRM, (booking_id,))).fetchone()
+    if res is not None:
         return {}
     else:
         abort(400, "This booking cannot be confirmed")
 
 
-# запустить тред
-def start_background_loop(loop):
-    asyncio.set_event_loop(loop)
-    loop.run_forever()
+# подтвердить несколько бронирований: [booking_id, ...], возвращает число подтвержденных
+@app.route('/confirm_batch', methods=['POST'])
+async def confirm_batch():
+    booking_ids = parse_booking_ids(await request.get_json())
+    w = await confirm_bookings(booking_ids)
+    return {'confirmed': w}
+
+
+# тело POST-запросов принимается только в JSON; проверка идет до разбора тела и до обращения к БД
+@app.before_request
+async def require_json():
+    if request.method == 'POST' and not request.is_json:
+        abort(415, "expected application/json body")
+
+
+# логи пишутся в отдельном потоке: обработчик запроса только кладет запись в очередь
+def start_logging():
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('[%(asctime)s] [%(process)d] [%(levelname)s] %(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
+# открыть соединения и запустить фоновую отмену бронирований в event loop сервера
+@app.before_serving
+async def startup():
+    check_sqlite_version()
+    app.log_listener = start_logging()
+    await init_pool()
+    app.sweeper = asyncio.create_task(sweep_bookings())
+
+
+@app.after_serving
+async def shutdown():
+    # дождаться отмены: прерванный проход откатывает транзакцию, пока соединение еще открыто
+    app.sweeper.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.sweeper
+    await close_pool()
+    # дописать оставшиеся в очереди записи и остановить поток
+    app.log_listener.stop()
+    logger.handlers.clear()
+
+
+# создать тестовую БД
+async def init_db():
+    con = await open_connection()
+    with open('schema.sql') as f:
+        await con.executescript(f.read())
+    await con.execute("INSERT INTO items (weight, volume, amount, price, image_url, name, street_address, coordinates) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (5, 7, 1000, 12, 'https://a.d-cd.net/9b4IHEwEtY01H94Gfk1mXPpkNF8-480.jpg', 'biba', 'Мясницкая 21', '123.52;74.81')
+                      )
+    await con.execute("INSERT INTO items (weight, volume, amount, price, image_url, name, street_address, coordinates) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (5, 7, 1000, 13, 'https://i.ytimg.com/vi/9cRuLmNlOwU/maxresdefault.jpg', 'boba', 'Покровский бульвар 17', '65.23;81.64')
+                      )
+    await con.close()
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('-init', help='initialize database', action='store_true')
+    parser.add_argument('-bind', help='address to listen on', default='127.0.0.1:5000')
+    parser.add_argument('-workers', help='number of server processes', type=int, default=4)
     args = parser.parse_args()
+    try:
+        check_sqlite_version()
+    except RuntimeError as e:
+        sys.exit(str(e))
     if args.init:
-        # создать тестовую БД
         print('initializing database from schema.sql')
-        con = get_db_connection()
-        with open('schema.sql') as f:
-            con.executescript(f.read())
-        cur = con.cursor()
-        cur.execute("INSERT INTO items (weight, volume, amount, price, image_url, name, street_address, coordinates) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (5, 7, 1000, 12, 'https://a.d-cd.net/9b4IHEwEtY01H94Gfk1mXPpkNF8-480.jpg', 'biba', 'Мясницкая 21', '123.52;74.81')
-                    )
-        cur.execute("INSERT INTO items (weight, volume, amount, price, image_url, name, street_address, coordinates) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (5, 7, 1000, 13, 'https://i.ytimg.com/vi/9cRuLmNlOwU/maxresdefault.jpg', 'boba', 'Покровский бульвар 17', '65.23;81.64')
-                    )
-        con.commit()
-        con.close()
-
-    # создать и запустить тред
-    loop = asyncio.new_event_loop()
-    t = Thread(target=start_background_loop, args=(loop,), daemon=True)
-    t.start()
-
-    # запустить сервер
-    app.run()
+        asyncio.run(init_db())
+
+    # запустить сервер: hypercorn с несколькими процессами вместо однопоточного dev-сервера.
+    # Каждый процесс импортирует store_server и при старте открывает собственный пул соединений
+    config = Config()
+    config.application_path = 'store_server:app'
+    config.bind = [args.bind]
+    config.workers = args.workers
+    config.worker_class = 'asyncio'
+    run(config)